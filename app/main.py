@@ -1,17 +1,35 @@
+from functools import partial
+
 import streamlit as st
 import pandas as pd
 from src.data_loader import load_country_data, generate_boxplot, top_regions
+from src.utils import set_plot_style
 
 st.set_page_config(page_title="Solar Insights Dashboard", layout="wide")
 
-st.title("🌞 Solar Energy Insights Dashboard")
 
-# Sidebar widgets
-st.sidebar.header("Filter Options")
-country = st.sidebar.selectbox(
-    "Select Country", ["Sierra Leone", "Togo", "Benin"])
-value_column = st.sidebar.selectbox(
-    "Select Variable", ["GHI", "Temperature", "Irradiance"])
+# Cached helpers — Streamlit reruns the whole script on every widget change,
+# so memoize the CSV parse and the derived outputs across reruns.
+@st.cache_data(show_spinner=False)
+def _load(path: str) -> pd.DataFrame:
+    # Read-only view of cleaned data, so float32/category dtypes are safe
+    return load_country_data(path, optimize=True)
+
+
+@st.cache_data(show_spinner=False)
+def _boxplot(df: pd.DataFrame, value_column: str):
+    return generate_boxplot(df, value_column)
+
+
+@st.cache_data(show_spinner=False)
+def _top_regions(df: pd.DataFrame, value_column: str) -> pd.DataFrame:
+    return top_regions(df, value_column)
+
+
+@st.cache_resource
+def _apply_plot_style() -> None:
+    set_plot_style()
+
 
 # Map country to CSV
 country_files = {
@@ -20,13 +38,28 @@ country_files = {
     "Benin": "data/benin_clean.csv"
 }
 
+# One zero-argument loader per country, built once at import time
+pipelines = {name: partial(_load, path) for name, path in country_files.items()}
+
+
+_apply_plot_style()
+
+st.title("🌞 Solar Energy Insights Dashboard")
+
+# Sidebar widgets
+st.sidebar.header("Filter Options")
+country = st.sidebar.selectbox(
+    "Select Country", ["Sierra Leone", "Togo", "Benin"])
+value_column = st.sidebar.selectbox(
+    "Select Variable", ["GHI", "Temperature", "Irradiance"])
+
 # Load data
-df = load_country_data(country_files[country])
+df = pipelines[country]()
 
 st.subheader(f"Boxplot of {value_column} in {country}")
-plt = generate_boxplot(df, value_column)
-st.pyplot(plt)
+fig = _boxplot(df, value_column)
+st.pyplot(fig)
 
 st.subheader(f"Top Regions by Average {value_column}")
-top_df = top_regions(df, value_column)
+top_df = _top_regions(df, value_column)
 st.table(top_df)
@@ -0,0 +1,12 @@
+"""
+src — Analysis package for the Solar Challenge datasets.
+"""
+
+import pandas as pd
+
+# Copy-on-Write lets the cleaning helpers return shallow copies that share
+# column buffers with their input until one side is modified, instead of
+# deep-copying the whole frame at every pipeline step. It is the default
+# behaviour from pandas 3.0 onwards.
+if int(pd.__version__.split(".", maxsplit=1)[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
@@ -9,76 +9,98 @@ Includes:
 - Wind rose plots
 """
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from src.utils import set_plot_style, print_section_header
+from src.utils import (
+    set_plot_style, print_section_header, correlation_matrix, describe_and_missing,
+    show_and_close,
+)
 
-try:
-    from windrose import WindroseAxes
-    _HAS_WINDROSE = True
-except ImportError:
-    _HAS_WINDROSE = False
+# Plotting libraries are imported inside the plotting functions so the
+# data-only path does not pay their import cost.
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
 def summary_statistics(df: pd.DataFrame) -> None:
     """Print summary statistics and missing values."""
+    describe_df, missing = describe_and_missing(df)
     print_section_header("SUMMARY STATISTICS")
-    print(df.describe())
+    print(describe_df)
     print("\nMissing values:")
-    print(df.isna().sum())
+    print(missing)
+
 
+def correlation_heatmap(df: pd.DataFrame, annot: bool = True) -> Figure:
+    """Plot correlation heatmap for numeric columns; annot=False skips cell labels."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-def correlation_heatmap(df: pd.DataFrame) -> None:
-    """Plot correlation heatmap for numeric columns."""
     set_plot_style()
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(df.corr(numeric_only=True), cmap="coolwarm", annot=True)
-    plt.title("Correlation Heatmap")
-    plt.show()
+    corr = correlation_matrix(df)
+    # Format all cell labels in one vectorized call instead of per cell
+    labels = np.char.mod("%.2f", corr.to_numpy()) if annot else False
+    fig, ax = plt.subplots(figsize=(8, 6))
+    sns.heatmap(corr, cmap="coolwarm", annot=labels, fmt="", ax=ax)
+    ax.set_title("Correlation Heatmap")
+    return fig
 
 
-def plot_time_series(df: pd.DataFrame, timestamp_col: str, cols: list[str]) -> None:
-    """Plot time series for selected columns."""
+def plot_time_series(df: pd.DataFrame, timestamp_col: str, cols: list[str]) -> list[Figure]:
+    """Plot time series for selected columns; one figure per column."""
+    import matplotlib.pyplot as plt
+
     if timestamp_col not in df.columns:
         print(f"Timestamp column '{timestamp_col}' not found.")
-        return
+        return []
 
-    df = df.copy()
-    df[timestamp_col] = pd.to_datetime(df[timestamp_col])
-    df.set_index(timestamp_col, inplace=True)
+    # Lazy copy: only the parsed timestamp column is new data
+    df = df.assign(**{timestamp_col: pd.to_datetime(df[timestamp_col])}).set_index(timestamp_col)
 
+    figures = []
     for col in cols:
         if col in df.columns:
-            plt.figure(figsize=(10, 4))
-            df[col].plot(title=f"{col.upper()} over Time")
-            plt.xlabel("Time")
-            plt.ylabel(col.upper())
-            plt.tight_layout()
-            plt.show()
+            fig, ax = plt.subplots(figsize=(10, 4))
+            df[col].plot(ax=ax, title=f"{col.upper()} over Time")
+            ax.set_xlabel("Time")
+            ax.set_ylabel(col.upper())
+            fig.tight_layout()
+            figures.append(fig)
+    return figures
 
 
-def plot_wind_rose(df: pd.DataFrame, ws_col: str = "ws", wd_col: str = "wd") -> None:
+def plot_wind_rose(df: pd.DataFrame, ws_col: str = "ws", wd_col: str = "wd") -> Figure | None:
     """Plot wind rose if Windrose library is installed."""
-    if not _HAS_WINDROSE:
+    import matplotlib.pyplot as plt
+
+    try:
+        from windrose import WindroseAxes  # Optional dependency
+    except ImportError:
         print("Windrose library not installed. Skipping wind rose plot.")
-        return
+        return None
 
     try:
-        ax = WindroseAxes.from_ax()
+        fig = plt.figure()
+        ax = WindroseAxes.from_ax(fig=fig)
         ax.bar(df[wd_col], df[ws_col], normed=True,
                opening=0.8, edgecolor="white")
         ax.set_title("Wind Rose")
-        plt.show()
+        return fig
     except KeyError as e:
         print(f"Columns missing for wind rose: {e}")
+        return None
 
 
 def run_full_analysis(df: pd.DataFrame, country: str, timestamp_col: str = "timestamp") -> None:
-    """Run full EDA/analysis pipeline."""
+    """Run full EDA/analysis pipeline, showing each figure and then closing it."""
     print_section_header(f"EDA for {country}")
     summary_statistics(df)
-    correlation_heatmap(df)
-    plot_time_series(df, timestamp_col, ["ghi", "dni", "dhi", "tamb"])
+    figures = [correlation_heatmap(df)]
+    figures += plot_time_series(df, timestamp_col, ["ghi", "dni", "dhi", "tamb"])
     if "ws" in df.columns and "wd" in df.columns:
-        plot_wind_rose(df)
+        figures.append(plot_wind_rose(df))
+    show_and_close(figures)
@@ -4,43 +4,72 @@ cleaning.py
 Module for cleaning and preprocessing solar datasets. hh
 """
 
+import warnings
+
+import numpy as np
 import pandas as pd
+from src import data_loader
+from src.utils import block_nan_mean_std, numeric_block
+
+try:
+    import narwhals as nw  # Optional dependency: Polars / PyArrow inputs
+    NARWHALS_AVAILABLE = True
+except ImportError:
+    NARWHALS_AVAILABLE = False
+from src.kernels import NUMBA_AVAILABLE, fill_median, impute_and_replace, use_numba
+
+__all__ = [
+    "KEY_NUMERIC_COLS",
+    "clean_column_names",
+    "remove_duplicates",
+    "handle_missing",
+    "remove_outliers",
+    "fill_missing_values",
+    "remove_outliers_iqr",
+    "clip_outliers_mad",
+    "clean_numeric_columns",
+    "clean_country_file",
+    "clean_countries",
+]
+
+# Numeric sensor columns checked for outliers across the cleaning pipeline
+KEY_NUMERIC_COLS = ["ghi", "dni", "dhi", "moda",
+                    "modb", "ws", "wsgust", "tamb", "rh"]
 
 
 def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardizes column names: lowercase, underscores, no spaces.
     """
-    df = df.copy()
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    return df
+    # One pass with native str methods instead of three Index-wide .str calls;
+    # set_axis returns a new frame that shares data with the input.
+    return df.set_axis(
+        [col.strip().lower().replace(' ', '_') for col in df.columns], axis=1)
 
 
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Removes duplicate rows, if any.
     """
-    df = df.copy()
-    before = len(df)
-    df = df.drop_duplicates()
-    after = len(df)
-    print(f"🧹 Removed {before - after} duplicate rows")
-    return df
+    # Hash rows once; the same mask gives both the count and the result
+    keep_mask = ~df.duplicated(keep='first')
+    removed = len(keep_mask) - keep_mask.sum()
+    print(f"🧹 Removed {removed} duplicate rows")
+    return df.loc[keep_mask]
 
 
 def handle_missing(df: pd.DataFrame) -> pd.DataFrame:
     """
     Fills missing numeric values with median and categorical with mode.
     """
-    df = df.copy()
-    for col in df.columns:
-        if df[col].dtype == 'O':  # object / categorical
-            mode_val = df[col].mode(
-            )[0] if not df[col].mode().empty else "Unknown"
-            df[col] = df[col].fillna(mode_val)
-        else:
-            df[col] = df[col].fillna(df[col].median())
-    return df
+    other = df.select_dtypes(exclude=['object', 'string', 'category'])
+    obj = df.select_dtypes(include=['object', 'string', 'category'])  # text / categorical
+    fills = other.median().to_dict()
+    for col in obj.columns:
+        mode = obj[col].mode()  # computed once: it sorts the whole column
+        fills[col] = mode.iat[0] if not mode.empty else "Unknown"
+    # One fillna call over the whole frame instead of one per column
+    return df.fillna(fills)
 
 
 def remove_outliers(df: pd.DataFrame, cols: list[str], factor: float = 1.5) -> pd.DataFrame:
@@ -52,36 +81,87 @@ def remove_outliers(df: pd.DataFrame, cols: list[str], factor: float = 1.5) -> p
         cols: list of column names to check for outliers
         factor: IQR multiplier (default=1.5)
     """
-    df = df.copy()
-    for col in cols:
-        if df[col].dtype != 'O':
-            q1 = df[col].quantile(0.25)
-            q3 = df[col].quantile(0.75)
-            iqr = q3 - q1
-            lower_bound = q1 - factor * iqr
-            upper_bound = q3 + factor * iqr
-            df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
-    return df
+    sub = df[cols].select_dtypes(exclude='O')
+    # Bounds come from the full column, computed for all columns in one call
+    q = sub.quantile([0.25, 0.75])
+    iqr = q.loc[0.75] - q.loc[0.25]
+    lower_bound = q.loc[0.25] - factor * iqr
+    upper_bound = q.loc[0.75] + factor * iqr
+    # Single combined row mask, applied once
+    mask = ((sub >= lower_bound) & (sub <= upper_bound)).all(axis=1)
+    return df.loc[mask]
 
 
-def fill_missing_values(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+def fill_missing_values(df: pd.DataFrame, cols: list[str], engine: str = "auto") -> pd.DataFrame:
     """
     Fill missing values in numeric columns with median (future-proof, no inplace warning).
+
+    Polars and PyArrow frames are handled through Narwhals and returned in
+    their own type; with Polars the per-column medians run in parallel
+    (PyArrow only offers an approximate median).
+
+    engine: "numba", "pandas", or "auto" (the compiled kernel when Numba is
+    installed and every selected column is float64). The numba engine
+    returns the selected columns as float64.
     """
-    df_filled = df.copy()
-    for col in cols:
-        if col in df_filled.columns:
-            df_filled[col] = pd.to_numeric(df_filled[col], errors="coerce")
-            df_filled[col] = df_filled[col].fillna(df_filled[col].median())
+    compiled = use_numba(engine)
+    if not isinstance(df, pd.DataFrame):
+        return _fill_missing_values_narwhals(df, cols)
+
+    df_filled = df.copy(deep=False)
+    present = [col for col in cols if col in df_filled.columns]
+    if not present:
+        return df_filled
+
+    if compiled and (engine == "numba" or (df_filled.dtypes[present] == np.float64).all()):
+        arr = numeric_block(df_filled, present)
+        fill_median(arr)  # compiled, parallel across columns
+        df_filled[present] = arr
+        return df_filled
+
+    # Column by column on plain arrays: no frame-level fillna alignment, and
+    # the median is only computed for columns that have gaps
+    for col in present:
+        values = df_filled[col]
+        coerced = not pd.api.types.is_numeric_dtype(values)
+        if coerced:
+            # Object columns may hide unparsable values that coerce to NaN,
+            # so they are always converted and written back
+            values = pd.to_numeric(values, errors="coerce")
+        arr = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(arr)
+        if missing.any():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN column
+                median = np.nanmedian(arr)
+            df_filled[col] = np.where(missing, median, arr)
+        elif coerced:
+            df_filled[col] = values
     return df_filled
 
 
+def _fill_missing_values_narwhals(df, cols: list[str]):
+    """fill_missing_values for any eager frame Narwhals supports."""
+    if not NARWHALS_AVAILABLE:
+        raise TypeError(
+            f"fill_missing_values needs narwhals for {type(df).__name__} input; "
+            "install it or pass a pandas DataFrame")
+    frame = nw.from_native(df, eager_only=True)
+    present = [col for col in cols if col in frame.columns]
+    if not present:
+        return df
+    # One expression per column, evaluated together by the native backend
+    return frame.with_columns(
+        [nw.col(col).fill_null(nw.col(col).median()) for col in present]
+    ).to_native()
+
+
 def remove_outliers_iqr(df: pd.DataFrame, cols: list[str], factor: float = 1.5) -> pd.DataFrame:
     """
     Replace outliers using IQR method instead of Z-score.
     More robust for extreme outliers.
     """
-    df_clean = df.copy()
+    df_clean = df.copy(deep=False)
     for col in cols:
         if col in df_clean.columns:
             numeric_series = pd.to_numeric(df_clean[col], errors='coerce')
@@ -96,8 +176,124 @@ def remove_outliers_iqr(df: pd.DataFrame, cols: list[str], factor: float = 1.5)
 
                 median_val = non_null_values.median()
                 # Replace values outside the bounds with median
-                outlier_mask = (numeric_series < lower_bound) | (
-                    numeric_series > upper_bound)
-                df_clean.loc[outlier_mask, col] = median_val
+                vals = numeric_series.to_numpy(dtype=np.float64)
+                with np.errstate(invalid="ignore"):
+                    outlier_mask = (vals < lower_bound) | (vals > upper_bound)
+                if not outlier_mask.any():
+                    continue
+                if pd.api.types.is_numeric_dtype(df_clean[col]):
+                    # Dense numeric column: one ndarray write, no .loc alignment
+                    df_clean[col] = np.where(outlier_mask, median_val, vals)
+                else:
+                    df_clean.loc[outlier_mask, col] = median_val  # keep non-numeric entries
+
+    return df_clean
+
+
+def clip_outliers_mad(df: pd.DataFrame, cols: list[str], threshold: float = 3.5) -> pd.DataFrame:
+    """
+    Replace outliers with the median using the median absolute deviation (MAD).
+
+    A value is an outlier when |x - median| / (1.4826 * MAD) > threshold.
+    Median and MAD are not inflated by the outliers themselves, and the same
+    median serves as the test centre and the replacement. NaN are left as is.
+    """
+    df_clean = df.copy(deep=False)
+    present = [col for col in cols if col in df_clean.columns]
+    if not present:
+        return df_clean
+
+    arr = numeric_block(df_clean, present)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        median = np.nanmedian(arr, axis=0)
+        deviation = np.abs(arr - median)  # one broadcast, reused for MAD and the test
+        mad = np.nanmedian(deviation, axis=0)
+
+    # MAD == 0 (over half the values identical) gives no usable scale: skip
+    scale = np.where(mad > 0, 1.4826 * mad, np.nan)
+    with np.errstate(invalid="ignore"):
+        outliers = deviation > threshold * scale
+    np.copyto(arr, median, where=outliers)  # in place: arr is our own copy
+    df_clean[present] = arr
+    return df_clean
 
+
+def clean_numeric_columns(df: pd.DataFrame, cols: list[str], threshold: float = 3.0) -> pd.DataFrame:
+    """
+    Impute missing values and replace Z-score outliers in a single pass.
+
+    Mean, sample std and median are computed once per column on the original
+    values; NaN and values with |Z| > threshold are both replaced by the
+    column median.
+
+    Args:
+        df: pandas DataFrame
+        cols: list of column names to clean (missing names are skipped)
+        threshold: absolute Z-score above which a value is an outlier
+    """
+    df_clean = df.copy(deep=False)
+    present = [col for col in cols if col in df_clean.columns]
+    if not present:
+        return df_clean
+
+    # One contiguous float64 block for all columns, cleaned in place
+    arr = numeric_block(df_clean, present)
+    if NUMBA_AVAILABLE:
+        # Compiled kernel, parallel across columns
+        impute_and_replace(arr, threshold)
+        df_clean[present] = arr
+        return df_clean
+
+    mean, std = block_nan_mean_std(arr)  # fused single-pass moments
+    with warnings.catch_warnings():
+        # All-NaN columns produce NaN statistics and are left as they are
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(arr, axis=0)
+
+    # Z-scores in one reused buffer: subtract, abs and divide write in place
+    z_scores = np.subtract(arr, mean)
+    np.abs(z_scores, out=z_scores)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(z_scores, np.where(std > 0, std, np.nan), out=z_scores)
+    replace_mask = np.isnan(arr) | (z_scores > threshold)
+    np.copyto(arr, median, where=replace_mask)
+    df_clean[present] = arr
     return df_clean
+
+
+def clean_country_file(filename: str, numeric_cols: list[str] | None = None) -> pd.DataFrame:
+    """
+    Load one country dataset and run the standard cleaning sequence:
+    column names -> missing values -> Z-score outliers.
+    """
+    if numeric_cols is None:
+        numeric_cols = KEY_NUMERIC_COLS
+    df = data_loader.load_country_data(filename)
+    df = clean_column_names(df)
+    df = handle_missing(df)
+    return clean_numeric_columns(df, numeric_cols)
+
+
+def _clean_country_worker(path: str, _country: str, numeric_cols: list[str] | None) -> pd.DataFrame:
+    """Worker for clean_countries; the country name only keys the result."""
+    return clean_country_file(path, numeric_cols)
+
+
+def clean_countries(
+    files: dict[str, str],
+    numeric_cols: list[str] | None = None,
+    n_jobs: int = 3,
+) -> dict[str, pd.DataFrame]:
+    """
+    Clean several country datasets in parallel worker processes.
+
+    Args:
+        files: mapping of country name to CSV filename in the data directory
+        numeric_cols: columns checked for outliers (default KEY_NUMERIC_COLS)
+        n_jobs: number of worker processes (one per file is optimal)
+
+    Returns:
+        Mapping of country name to cleaned DataFrame.
+    """
+    return data_loader.map_country_files(_clean_country_worker, files, n_jobs, numeric_cols)
@@ -2,15 +2,30 @@
 data_loader.py — Functions to load solar datasets from the workspace data folder.
 """
 
+from __future__ import annotations
+
+import os
+from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
 import pandas as pd
+from joblib import cpu_count
+from joblib.externals.loky import get_reusable_executor
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 # Base directory where raw CSV files are stored
 BASE_DATA_DIR = Path(
     r"D:\Python\Week_01\Assignment\solar-challenge-week0\data")
 
 
-def load_country_data(filename: str) -> pd.DataFrame:
+def load_country_data(
+    filename: str,
+    optimize: bool = False,
+    dtype: dict[str, str] | None = None,
+) -> pd.DataFrame:
     """
     Load a CSV dataset from the base data directory.
 
@@ -18,6 +33,12 @@ def load_country_data(filename: str) -> pd.DataFrame:
     ----------
     filename : str
         Name of the CSV file to load (e.g., "benin-malanville.csv").
+    optimize : bool
+        If True, shrink the frame with optimize_dtypes() after loading.
+    dtype : dict, optional
+        Column types for the CSV parser, which then skips type inference for
+        those columns. Ignored when the Parquet sibling is read, since Parquet
+        stores its own types.
 
     Returns
     -------
@@ -28,7 +49,143 @@ def load_country_data(filename: str) -> pd.DataFrame:
     if not file_path.exists():
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
 
-    df = pd.read_csv(file_path)
+    # Prefer an up-to-date Parquet sibling written by convert_to_parquet()
+    parquet_path = file_path.with_suffix(".parquet")
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= file_path.stat().st_mtime:
+        df = pd.read_parquet(parquet_path)
+    else:
+        if file_path.stat().st_size == 0:
+            raise pd.errors.EmptyDataError(f"Dataset file is empty: {file_path}")
+        # Arrow's multithreaded C++ CSV parser
+        df = pd.read_csv(file_path, engine="pyarrow", dtype=dtype)
+
     # Strip leading/trailing spaces from column names
     df.columns = df.columns.str.strip()
+    if optimize:
+        df = optimize_dtypes(df)
+    return df
+
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = 0.05) -> pd.DataFrame:
+    """
+    Reduce memory use by downcasting floats and categorizing repeated strings.
+
+    float64 columns become float32 where the values fit, and object columns
+    whose unique/total ratio is below `category_ratio` (e.g. region or
+    cleaning flags) become `category`. Halving the bytes per value speeds up
+    memory-bound reductions such as describe, corr and mean/std.
+
+    Note that float32 values no longer round-trip exactly through float64,
+    so leave this off for data that is cleaned and exported again.
+    """
+    df = df.copy(deep=False)
+    for col in df.select_dtypes(include="float64").columns:
+        df[col] = pd.to_numeric(df[col], downcast="float")
+    n_rows = max(len(df), 1)
+    for col in df.select_dtypes(include="object").columns:
+        if df[col].nunique() / n_rows < category_ratio:
+            df[col] = df[col].astype("category")
     return df
+
+
+def convert_to_parquet(filename: str) -> Path:
+    """
+    Write a Parquet copy of a CSV dataset next to the original file.
+
+    load_country_data() reads the Parquet file instead of the CSV while it
+    is not older than the CSV, which skips CSV parsing on later loads.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the CSV file in the base data directory.
+
+    Returns
+    -------
+    Path
+        Path of the written Parquet file.
+    """
+    file_path = BASE_DATA_DIR / filename
+    df = pd.read_csv(file_path, engine="pyarrow")
+    parquet_path = file_path.with_suffix(".parquet")
+    df.to_parquet(parquet_path, index=False)
+    return parquet_path
+
+
+# Thread-pool sizes handed to every worker process. Polars reads its
+# variable only at import, so it must be in the worker's environment at start.
+_THREAD_LIMIT_VARS = ("POLARS_MAX_THREADS", "NUMBA_NUM_THREADS", "OMP_NUM_THREADS",
+                      "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def map_country_files(
+    func: Callable[..., Any],
+    files: dict[str, str],
+    n_jobs: int,
+    *args: Any,
+) -> dict[str, Any]:
+    """
+    Call func(path, country, *args) for every country file in worker processes.
+
+    At most one worker per file is started, and the cores are split between
+    the workers' thread pools (Polars, Numba, BLAS) unless the variables are
+    already set in this process. A single worker runs in this process.
+
+    Args:
+        func: worker taking the full file path and the country name first
+        files: mapping of country name to filename in the data directory
+        n_jobs: number of worker processes (-1 uses every core)
+
+    Returns:
+        Mapping of country name to the worker's result.
+    """
+    # Resolve paths here: workers re-import data_loader and would not see a
+    # BASE_DATA_DIR reassigned in this process.
+    paths = [str(BASE_DATA_DIR / name) for name in files.values()]
+    cores = cpu_count()
+    workers = min(len(paths), n_jobs if n_jobs > 0 else max(1, cores + 1 + n_jobs))
+    if workers <= 1:
+        return {country: func(path, country, *args) for path, country in zip(paths, files)}
+
+    threads = str(max(1, cores // workers))
+    env = {var: os.environ.get(var, threads) for var in _THREAD_LIMIT_VARS}
+    # A changed env or worker count replaces the reused executor's processes
+    executor = get_reusable_executor(max_workers=workers, env=env)
+    futures = [executor.submit(func, path, country, *args)
+               for path, country in zip(paths, files)]
+    return {country: future.result() for country, future in zip(files, futures)}
+
+
+def generate_boxplot(df: pd.DataFrame, value_column: str) -> Figure:
+    """
+    Build a boxplot of a single column.
+
+    Returns the Matplotlib Figure instead of drawing on the global pyplot
+    state, so callers (e.g. Streamlit) can cache and render it explicitly.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.boxplot(df[value_column].dropna(), vert=False)
+    ax.set_xlabel(value_column)
+    ax.set_yticks([])
+    fig.tight_layout()
+    return fig
+
+
+def top_regions(
+    df: pd.DataFrame,
+    value_column: str,
+    n: int = 10,
+    region_col: str = "region",
+) -> pd.DataFrame:
+    """Return the top `n` regions ranked by the average of `value_column`."""
+    # Unsorted hash aggregation + partial sort; observed=True skips empty
+    # categories when the region column is categorical.
+    return (
+        df.groupby(region_col, observed=True, sort=False)[value_column]
+        .mean()
+        .nlargest(n)
+        .rename("avg")
+        .reset_index()
+    )
@@ -5,17 +5,24 @@ Performs statistical summaries, missing-value analysis, outlier detection,
 and visualizations including correlation, distribution, and wind rose analysis.
 """
 
+from __future__ import annotations
+
 import os
+import warnings
+from typing import TYPE_CHECKING
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from src.kernels import NUMBA_AVAILABLE, zscore_clean
+from src.utils import (
+    block_nan_mean_std, correlation_matrix, describe_and_missing, numeric_block, show_and_close,
+)
 
-try:
-    from windrose import WindroseAxes  # Optional dependency
-    _HAS_WINDROSE = True
-except ImportError:
-    _HAS_WINDROSE = False
+# Plotting libraries are imported inside the plotting functions so the
+# data-only path (summary, missing report, outlier cleaning) does not pay
+# their import cost.
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
 # ---------------------------------------------------------------------
@@ -23,11 +30,12 @@ except ImportError:
 # ---------------------------------------------------------------------
 def summary_and_missing_report(df: pd.DataFrame) -> None:
     """Display summary statistics and missing-value counts."""
+    # pandas >= 2 summarizes datetimes numerically without datetime_is_numeric
+    describe_df, missing_report = describe_and_missing(df, include="all")
     print("=== SUMMARY STATISTICS ===")
-    print(df.describe(include="all", datetime_is_numeric=True))
+    print(describe_df)
 
     print("\n=== MISSING VALUE REPORT ===")
-    missing_report = df.isna().sum()
     print(missing_report)
 
     null_threshold = len(df) * 0.05
@@ -45,40 +53,61 @@ def summary_and_missing_report(df: pd.DataFrame) -> None:
 # ---------------------------------------------------------------------
 def detect_and_clean_outliers(df: pd.DataFrame, numeric_cols: list[str]) -> pd.DataFrame:
     """Detect and clean outliers using Z-score; impute missing values."""
-    df_clean = df.copy()
-
-    for col in numeric_cols:
-        if col in df_clean.columns:
-            df_clean[col] = pd.to_numeric(df_clean[col], errors="coerce")
-            z_scores = (df_clean[col] - df_clean[col].mean()
-                        ) / df_clean[col].std()
-            df_clean.loc[z_scores.abs() > 3, col] = np.nan
-            df_clean[col] = df_clean[col].fillna(df_clean[col].median())
-
+    df_clean = df.copy(deep=False)
+
+    present = [col for col in numeric_cols if col in df_clean.columns]
+    if not present:
+        return df_clean
+
+    arr = numeric_block(df_clean, present)  # one writable block, modified in place
+    if NUMBA_AVAILABLE:
+        # Compiled kernel, parallel across columns
+        zscore_clean(arr, 3.0, True)
+        df_clean[present] = arr
+        return df_clean
+
+    # Column statistics for the whole block at once, broadcast along rows;
+    # all-NaN / single-value columns give NaN statistics: nothing flagged
+    mean, std = block_nan_mean_std(arr)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        z_scores = np.subtract(arr, mean)
+        np.abs(z_scores, out=z_scores)  # reuse one buffer for |x - mean| / std
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(z_scores, np.where(std > 0, std, np.nan), out=z_scores)
+        arr[z_scores > 3] = np.nan
+        # Median of the remaining values imputes both outliers and NaN
+        median = np.nanmedian(arr, axis=0)
+    np.copyto(arr, median, where=np.isnan(arr))
+    df_clean[present] = arr
     return df_clean
 
 
 # ---------------------------------------------------------------------
 # 3️⃣ Time Series Analysis
 # ---------------------------------------------------------------------
-def time_series_analysis(df: pd.DataFrame, timestamp_col: str, cols: list[str]) -> None:
-    """Plot time series for given columns against timestamp."""
+def time_series_analysis(df: pd.DataFrame, timestamp_col: str, cols: list[str]) -> list[Figure]:
+    """Plot time series for given columns against timestamp; one figure per column."""
+    import matplotlib.pyplot as plt
+
     try:
         df[timestamp_col] = pd.to_datetime(df[timestamp_col])
         df = df.sort_values(by=timestamp_col)
         df.set_index(timestamp_col, inplace=True)
     except (KeyError, ValueError) as err:
         print(f"Time column issue: {err}")
-        return
+        return []
 
+    figures = []
     for col in cols:
         if col in df.columns:
-            plt.figure(figsize=(10, 4))
-            df[col].plot(title=f"{col} over Time")
-            plt.xlabel("Time")
-            plt.ylabel(col)
-            plt.tight_layout()
-            plt.show()
+            fig, ax = plt.subplots(figsize=(10, 4))
+            df[col].plot(ax=ax, title=f"{col} over Time")
+            ax.set_xlabel("Time")
+            ax.set_ylabel(col)
+            fig.tight_layout()
+            figures.append(fig)
+    return figures
 
 
 # ---------------------------------------------------------------------
@@ -88,43 +117,57 @@ def plot_cleaning_impact(
     df: pd.DataFrame,
     cleaning_flag_col: str = "cleaning",
     mod_cols: list[str] | None = None,
-) -> None:
+) -> Figure | None:
     """Plot average ModA and ModB values before/after cleaning."""
+    import matplotlib.pyplot as plt
+
     if mod_cols is None:
         mod_cols = ["moda", "modb"]
 
     if cleaning_flag_col not in df.columns:
         print(f"Column {cleaning_flag_col} not found.")
-        return
+        return None
 
     try:
         grouped = df.groupby(cleaning_flag_col)[mod_cols].mean()
-        grouped.plot(kind="bar", figsize=(6, 4))
-        plt.title("Average ModA & ModB by Cleaning Flag")
-        plt.ylabel("Average Value")
-        plt.tight_layout()
-        plt.show()
+        fig, ax = plt.subplots(figsize=(6, 4))
+        grouped.plot(kind="bar", ax=ax)
+        ax.set_title("Average ModA & ModB by Cleaning Flag")
+        ax.set_ylabel("Average Value")
+        fig.tight_layout()
+        return fig
     except (KeyError, ValueError, TypeError) as err:
         print(f"Could not plot cleaning impact: {err}")
+        return None
 
 
 # ---------------------------------------------------------------------
 # 5️⃣ Correlation & Relationship Analysis
 # ---------------------------------------------------------------------
-def correlation_heatmap(df: pd.DataFrame) -> None:
-    """Plot heatmap of key correlations."""
+def correlation_heatmap(df: pd.DataFrame, annot: bool = True) -> Figure | None:
+    """Plot heatmap of key correlations; annot=False skips cell labels."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     try:
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(df.corr(numeric_only=True), cmap="coolwarm", annot=True)
-        plt.title("Correlation Heatmap")
-        plt.tight_layout()
-        plt.show()
+        corr = correlation_matrix(df)
+        # Format all cell labels in one vectorized call instead of per cell
+        labels = np.char.mod("%.2f", corr.to_numpy()) if annot else False
+        fig, ax = plt.subplots(figsize=(8, 6))
+        sns.heatmap(corr, cmap="coolwarm", annot=labels, fmt="", ax=ax)
+        ax.set_title("Correlation Heatmap")
+        fig.tight_layout()
+        return fig
     except (KeyError, ValueError) as err:
         print(f"Correlation plot failed: {err}")
+        return None
+
 
+def scatter_plots(df: pd.DataFrame) -> Figure | None:
+    """Generate selected scatter plots as panels of a single figure."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-def scatter_plots(df: pd.DataFrame) -> None:
-    """Generate selected scatter plots."""
     pairs = [
         ("ws", "ghi"),
         ("wsgust", "ghi"),
@@ -132,76 +175,101 @@ def scatter_plots(df: pd.DataFrame) -> None:
         ("rh", "tamb"),
         ("rh", "ghi"),
     ]
+    pairs = [(x, y) for x, y in pairs if x in df.columns and y in df.columns]
+    if not pairs:
+        return None
 
-    for x, y in pairs:
-        if x in df.columns and y in df.columns:
-            plt.figure(figsize=(5, 4))
-            sns.scatterplot(data=df, x=x, y=y)
-            plt.title(f"{x.upper()} vs {y.upper()}")
-            plt.tight_layout()
-            plt.show()
+    # One figure for all pairs; rasterized points keep saved files small
+    fig, axes = plt.subplots(2, 3, figsize=(12, 8))
+    for ax, (x, y) in zip(axes.ravel(), pairs):
+        sns.scatterplot(data=df, x=x, y=y, ax=ax, s=6, rasterized=True)
+        ax.set_title(f"{x.upper()} vs {y.upper()}")
+    for ax in axes.ravel()[len(pairs):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return fig
 
 
 # ---------------------------------------------------------------------
 # 6️⃣ Wind & Distribution Analysis
 # ---------------------------------------------------------------------
-def wind_rose_plot(df: pd.DataFrame, ws_col: str = "ws", wd_col: str = "wd") -> None:
+def wind_rose_plot(df: pd.DataFrame, ws_col: str = "ws", wd_col: str = "wd") -> Figure | None:
     """Plot wind rose if windrose library is available."""
-    if not _HAS_WINDROSE:
+    import matplotlib.pyplot as plt
+
+    try:
+        from windrose import WindroseAxes  # Optional dependency
+    except ImportError:
         print("Windrose library not installed; skipping wind plot.")
-        return
+        return None
 
     try:
-        ax = WindroseAxes.from_ax()
+        fig = plt.figure()
+        ax = WindroseAxes.from_ax(fig=fig)
         ax.bar(df[wd_col], df[ws_col], normed=True,
                opening=0.8, edgecolor="white")
         ax.set_title("Wind Rose Plot")
-        plt.show()
+        return fig
     except (KeyError, ValueError) as err:
         print(f"Wind rose plot failed: {err}")
+        return None
 
 
-def histogram_and_distribution(df: pd.DataFrame, var: str) -> None:
+def histogram_and_distribution(df: pd.DataFrame, var: str) -> Figure | None:
     """Plot histogram for a given variable."""
-    if var in df.columns:
-        plt.figure(figsize=(6, 4))
-        sns.histplot(df[var], bins=30, kde=True)
-        plt.title(f"Distribution of {var}")
-        plt.tight_layout()
-        plt.show()
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    if var not in df.columns:
+        return None
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    sns.histplot(df[var], bins=30, kde=True, ax=ax)
+    ax.set_title(f"Distribution of {var}")
+    fig.tight_layout()
+    return fig
 
 
 # ---------------------------------------------------------------------
 # 7️⃣ Temperature Analysis
 # ---------------------------------------------------------------------
-def temperature_vs_humidity_analysis(df: pd.DataFrame) -> None:
+def temperature_vs_humidity_analysis(df: pd.DataFrame) -> Figure | None:
     """Analyze how RH influences temperature."""
-    if "rh" in df.columns and "tamb" in df.columns:
-        plt.figure(figsize=(6, 4))
-        sns.scatterplot(x=df["rh"], y=df["tamb"])
-        plt.title("Relative Humidity vs Temperature (Tamb)")
-        plt.tight_layout()
-        plt.show()
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    if "rh" not in df.columns or "tamb" not in df.columns:
+        return None
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    sns.scatterplot(x=df["rh"], y=df["tamb"], ax=ax)
+    ax.set_title("Relative Humidity vs Temperature (Tamb)")
+    fig.tight_layout()
+    return fig
 
 
 # ---------------------------------------------------------------------
 # 8️⃣ Bubble Chart
 # ---------------------------------------------------------------------
-def bubble_chart_ghi_vs_tamb(df: pd.DataFrame) -> None:
+def bubble_chart_ghi_vs_tamb(df: pd.DataFrame) -> Figure | None:
     """Plot bubble chart of GHI vs Tamb with bubble size = RH or BP."""
-    if "ghi" in df.columns and "tamb" in df.columns:
-        bubble_size = (
-            df["rh"]
-            if "rh" in df.columns
-            else df.get("bp", pd.Series(20, index=df.index))
-        )
-        plt.figure(figsize=(6, 4))
-        plt.scatter(df["ghi"], df["tamb"], s=bubble_size, alpha=0.5)
-        plt.title("GHI vs Tamb (Bubble = RH or BP)")
-        plt.xlabel("GHI")
-        plt.ylabel("Tamb")
-        plt.tight_layout()
-        plt.show()
+    import matplotlib.pyplot as plt
+
+    if "ghi" not in df.columns or "tamb" not in df.columns:
+        return None
+
+    bubble_size = (
+        df["rh"]
+        if "rh" in df.columns
+        else df.get("bp", pd.Series(20, index=df.index))
+    )
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.scatter(df["ghi"], df["tamb"], s=bubble_size, alpha=0.5)
+    ax.set_title("GHI vs Tamb (Bubble = RH or BP)")
+    ax.set_xlabel("GHI")
+    ax.set_ylabel("Tamb")
+    fig.tight_layout()
+    return fig
 
 
 # ---------------------------------------------------------------------
@@ -212,7 +280,7 @@ def run_full_eda_pipeline(
     country: str,
     timestamp_col: str = "timestamp",
 ) -> pd.DataFrame:
-    """Run the entire EDA pipeline."""
+    """Run the entire EDA pipeline; figures are shown and then closed."""
     print(f"=== EDA for {country.upper()} ===")
 
     summary_and_missing_report(df)
@@ -225,19 +293,20 @@ def run_full_eda_pipeline(
     df_cleaned.to_csv(out_path, index=False)
     print(f"Cleaned dataset exported to: {out_path}")
 
-    time_series_analysis(df_cleaned, timestamp_col, [
-                         "ghi", "dni", "dhi", "tamb"])
-    plot_cleaning_impact(df_cleaned, "cleaning", ["moda", "modb"])
-    correlation_heatmap(df_cleaned)
-    scatter_plots(df_cleaned)
+    figures = time_series_analysis(df_cleaned, timestamp_col, [
+                                   "ghi", "dni", "dhi", "tamb"])
+    figures.append(plot_cleaning_impact(df_cleaned, "cleaning", ["moda", "modb"]))
+    figures.append(correlation_heatmap(df_cleaned))
+    figures.append(scatter_plots(df_cleaned))
 
     if "ws" in df_cleaned.columns and "wd" in df_cleaned.columns:
-        wind_rose_plot(df_cleaned, "ws", "wd")
+        figures.append(wind_rose_plot(df_cleaned, "ws", "wd"))
 
-    histogram_and_distribution(df_cleaned, "ghi")
-    histogram_and_distribution(df_cleaned, "ws")
-    temperature_vs_humidity_analysis(df_cleaned)
-    bubble_chart_ghi_vs_tamb(df_cleaned)
+    figures.append(histogram_and_distribution(df_cleaned, "ghi"))
+    figures.append(histogram_and_distribution(df_cleaned, "ws"))
+    figures.append(temperature_vs_humidity_analysis(df_cleaned))
+    figures.append(bubble_chart_ghi_vs_tamb(df_cleaned))
+    show_and_close(figures)  # shown once, then released from pyplot's registry
 
     print("\n=== EDA PIPELINE COMPLETE ===")
     return df_cleaned
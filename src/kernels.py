@@ -0,0 +1,152 @@
+"""
+kernels.py — Compiled numeric kernels for the cleaning pipeline.
+
+Numba is an optional dependency. When it is missing the kernels below are
+plain Python functions, so callers check NUMBA_AVAILABLE and keep their
+pandas/NumPy implementation as the fallback path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange  # Optional dependency
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+def use_numba(engine: str) -> bool:
+    """
+    Resolve an engine name ("numba", "pandas" or "auto") to whether the
+    compiled kernels should run.
+
+    "numba" without Numba installed is an error rather than a silent run of
+    the interpreted stand-ins, which are far slower than the NumPy path.
+    """
+    if engine not in ("auto", "numba", "pandas"):
+        raise ValueError(f"engine must be 'auto', 'numba' or 'pandas', got {engine!r}")
+    if engine == "numba" and not NUMBA_AVAILABLE:
+        raise ImportError("engine='numba' needs numba; install the 'fast' extra "
+                          "or use engine='pandas'")
+    return engine != "pandas" and NUMBA_AVAILABLE
+
+
+# ---------------------------------------------------------------------
+# 1️⃣ Column statistics
+# ---------------------------------------------------------------------
+@njit(cache=True)
+def nan_mean_std(col):
+    """Return (mean, sample std with ddof=1) of the non-NaN values of a 1-D array."""
+    count = 0
+    total = 0.0
+    for i in range(col.shape[0]):
+        if not np.isnan(col[i]):
+            count += 1
+            total += col[i]
+    if count == 0:
+        return np.nan, np.nan
+    mean = total / count
+
+    sq_dev = 0.0
+    for i in range(col.shape[0]):
+        if not np.isnan(col[i]):
+            sq_dev += (col[i] - mean) ** 2
+    std = np.sqrt(sq_dev / (count - 1)) if count > 1 else np.nan
+    return mean, std
+
+
+# ---------------------------------------------------------------------
+# 2️⃣ Z-score outlier replacement
+# ---------------------------------------------------------------------
+@njit(parallel=True, cache=True)
+def zscore_clean(arr, threshold, impute):
+    """
+    Replace |Z| > threshold values column by column, in place.
+
+    `arr` is a 2-D float64 array (Fortran order keeps columns contiguous).
+    Mean and sample std (ddof=1) skip NaN, matching pandas.
+
+    impute=False: outliers take the column median; NaN are left untouched.
+    impute=True: outliers are dropped first, then outliers and NaN take the
+    median of the remaining values.
+    """
+    n_rows, n_cols = arr.shape
+    for j in prange(n_cols):
+        col = arr[:, j]
+        mean, std = nan_mean_std(col)
+        if np.isnan(mean):
+            continue
+
+        outlier = np.zeros(n_rows, dtype=np.bool_)
+        if std > 0:
+            for i in range(n_rows):
+                if np.abs((col[i] - mean) / std) > threshold:
+                    outlier[i] = True
+
+        if impute:
+            for i in range(n_rows):
+                if outlier[i]:
+                    col[i] = np.nan
+            median = np.nanmedian(col)
+            for i in range(n_rows):
+                if np.isnan(col[i]):
+                    col[i] = median
+        else:
+            median = np.nanmedian(col)
+            for i in range(n_rows):
+                if outlier[i]:
+                    col[i] = median
+
+
+# ---------------------------------------------------------------------
+# 3️⃣ Fused imputation + outlier replacement
+# ---------------------------------------------------------------------
+@njit(parallel=True, cache=True)
+def impute_and_replace(arr, threshold):
+    """
+    Replace NaN and |Z| > threshold values with the column median, in place.
+
+    Mean, sample std and median are all taken from the original non-NaN
+    values of each column, so every column is cleaned in a single sweep.
+    """
+    n_rows, n_cols = arr.shape
+    for j in prange(n_cols):
+        col = arr[:, j]
+        mean, std = nan_mean_std(col)
+        if np.isnan(mean):
+            continue  # all-NaN column: nothing to impute from
+        median = np.nanmedian(col)
+        check_z = std > 0
+        for i in range(n_rows):
+            value = col[i]
+            if np.isnan(value) or (check_z and np.abs((value - mean) / std) > threshold):
+                col[i] = median
+
+
+# ---------------------------------------------------------------------
+# 4️⃣ Median imputation
+# ---------------------------------------------------------------------
+@njit(parallel=True, cache=True)
+def fill_median(arr):
+    """Replace NaN with the column median, in place; clean columns are skipped."""
+    n_rows, n_cols = arr.shape
+    for j in prange(n_cols):
+        col = arr[:, j]
+        has_nan = False
+        for i in range(n_rows):
+            if np.isnan(col[i]):
+                has_nan = True
+                break
+        if not has_nan:
+            continue
+        median = np.nanmedian(col)  # NaN for an all-NaN column: left as is
+        for i in range(n_rows):
+            if np.isnan(col[i]):
+                col[i] = median
@@ -109,7 +109,7 @@ def save_predictions(
     Save true vs predicted values as CSV.
     """
     ensure_directory(folder)
-    df_out = df_test.copy()
+    df_out = df_test.copy(deep=False)  # Copy-on-Write: df_test stays unchanged
     df_out["y_true"] = y_test.values
     df_out["y_pred"] = y_pred
     path = os.path.join(folder, filename)
@@ -8,67 +8,151 @@ Handles:
 - Exporting cleaned datasets
 """
 
+import numpy as np
 import pandas as pd
-# import numpy as np
-from src.utils import save_csv_safely, generate_clean_filename
+from src import data_loader
+# Shared with the cleaning module; one implementation per helper
+from src.cleaning import (
+    KEY_NUMERIC_COLS, clean_column_names as standardize_columns, clean_numeric_columns,
+    fill_missing_values,
+)
+from src.kernels import use_numba, zscore_clean
+from src.utils import block_nan_mean_std, numeric_block, save_csv_safely, generate_clean_filename
 
+try:
+    import polars as pl  # Optional dependency
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
 
-def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert all column names to lowercase and replace spaces with underscores."""
-    df = df.copy()
-    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
-    return df
+__all__ = [
+    "standardize_columns",
+    "fill_missing_values",  # re-exported from src.cleaning
+    "remove_outliers_zscore",
+    "clean_numeric_columns_polars",
+    "preprocess_dataset",
+    "preprocess_all",
+]
 
 
-def fill_missing_values(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+def remove_outliers_zscore(df: pd.DataFrame, cols: list[str], engine: str = "auto") -> pd.DataFrame:
     """
-    Fill missing values in numeric columns with the median.
-
-    Parameters
-    ----------
-    df : pd.DataFrame
-        Input DataFrame.
-    cols : list[str]
-        List of columns to fill missing values for.
-
-    Returns
-    -------
-    pd.DataFrame
-        DataFrame with missing values filled.
+    Replace outliers (|Z| > 3) with median in numeric columns.
+
+    engine: "numba", "pandas", or "auto" (Numba when it is installed).
     """
-    df = df.copy()
-    for col in cols:
-        if col in df.columns:
-            # Ensure column is numeric
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-            # Fill missing values with median safely
-            df[col] = df[col].fillna(df[col].median())
+    compiled = use_numba(engine)
+    df = df.copy(deep=False)
+    present = [col for col in cols if col in df.columns]
+    if not present:
+        return df
+
+    arr = numeric_block(df, present)  # one writable block, modified in place
+    if compiled:
+        # Compiled kernel, parallel across columns
+        zscore_clean(arr, 3.0, False)
+        df[present] = arr
+        return df
+
+    # Mean and std of every column in one fused pass, median in one
+    # reduction, all taken from the original values before any replacement
+    mean, std = block_nan_mean_std(arr)
+    # Constant or all-NaN columns cannot hold outliers: skip their median
+    active = np.isfinite(std) & (std > 0)
+    if not active.any():
+        df[present] = arr
+        return df
+    median = np.full(len(present), np.nan)
+    median[active] = np.nanmedian(arr[:, active], axis=0)
+    deviation = np.subtract(arr, mean)
+    np.abs(deviation, out=deviation)  # reuse the buffer instead of a second temporary
+    np.copyto(arr, median, where=deviation > 3 * std)
+    df[present] = arr
     return df
 
 
-def remove_outliers_zscore(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
-    """Replace outliers (|Z| > 3) with median in numeric columns."""
-    df = df.copy()
-    for col in cols:
-        if col in df.columns:
-            mean = df[col].mean()
-            std = df[col].std()
-            z_scores = (df[col] - mean) / std
-            df.loc[z_scores.abs() > 3, col] = df[col].median()
+def clean_numeric_columns_polars(df: pd.DataFrame, cols: list[str], threshold: float = 3.0) -> pd.DataFrame:
+    """
+    Polars version of clean_numeric_columns.
+
+    The key-column block goes through one lazy query: every column is an
+    independent when/then expression, so Polars evaluates them in parallel.
+    Non-key columns, dtypes and the index of `df` are left untouched.
+    """
+    if not POLARS_AVAILABLE:
+        raise ImportError("clean_numeric_columns_polars needs polars; install it "
+                          "or use clean_numeric_columns")
+    df = df.copy(deep=False)
+    present = [col for col in cols if col in df.columns]
+    if not present:
+        return df
+
+    sub = df[present].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    exprs = []
+    for col in present:
+        c = pl.col(col)
+        # std > 0 guard: a constant column would otherwise give NaN Z-scores,
+        # which Polars orders above every number
+        outlier = (c.std() > 0) & (((c - c.mean()) / c.std()).abs() > threshold)
+        exprs.append(pl.when(c.is_null() | outlier).then(c.median()).otherwise(c).alias(col))
+
+    cleaned = pl.from_pandas(sub).lazy().with_columns(exprs).collect()
+    df[present] = cleaned.to_numpy()
     return df
 
 
-def preprocess_dataset(df: pd.DataFrame, country: str) -> pd.DataFrame:
-    """Run full preprocessing pipeline."""
+def preprocess_dataset(df: pd.DataFrame, country: str, engine: str = "auto") -> pd.DataFrame:
+    """
+    Run full preprocessing pipeline.
+
+    engine: "polars", "pandas", or "auto" (Polars when it is installed).
+    """
+    if engine not in ("auto", "polars", "pandas"):
+        raise ValueError(f"engine must be 'auto', 'polars' or 'pandas', got {engine!r}")
     df = standardize_columns(df)
 
-    key_cols = ["ghi", "dni", "dhi", "moda",
-                "modb", "ws", "wsgust", "tamb", "rh"]
-    df = fill_missing_values(df, key_cols)
-    df = remove_outliers_zscore(df, key_cols)
+    # Arrow-backed strings for the text columns (timestamps, comments):
+    # contiguous buffers instead of boxed Python objects. Key columns are
+    # left alone, they become a float64 block for the cleaning kernels.
+    text_cols = [col for col in df.select_dtypes(include="object").columns
+                 if col not in KEY_NUMERIC_COLS]
+    if text_cols:
+        df = df.astype({col: "string[pyarrow]" for col in text_cols})
+
+    # Median imputation and Z-score replacement in one pass over the
+    # key-column block (statistics computed once on the raw values)
+    if engine == "polars" or (engine == "auto" and POLARS_AVAILABLE):
+        df = clean_numeric_columns_polars(df, KEY_NUMERIC_COLS)
+    else:
+        df = clean_numeric_columns(df, KEY_NUMERIC_COLS)
 
     # Save cleaned dataset
     out_file = generate_clean_filename("", country)
     save_csv_safely(df, out_file)
 
     return df
+
+
+def _preprocess_file(path: str, country: str, engine: str) -> pd.DataFrame:
+    """Worker: load one raw country file and preprocess it."""
+    return preprocess_dataset(data_loader.load_country_data(path), country, engine=engine)
+
+
+def preprocess_all(
+    files: dict[str, str],
+    n_jobs: int = -1,
+    engine: str = "auto",
+) -> dict[str, pd.DataFrame]:
+    """
+    Preprocess several country datasets in parallel worker processes.
+
+    Args:
+        files: mapping of country name to raw CSV filename in the data directory
+        n_jobs: number of worker processes (-1 uses every core, capped at one
+            per file; see data_loader.map_country_files for the thread budget)
+        engine: passed to preprocess_dataset
+
+    Returns:
+        Mapping of country name to preprocessed DataFrame.
+    """
+    return data_loader.map_country_files(_preprocess_file, files, n_jobs, engine)
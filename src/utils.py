@@ -4,12 +4,36 @@ utils.py — Shared utility functions for solar dataset analysis.
 
 Provides reusable helpers for file operations, logging, data validation,
 and visualization consistency.
+
+Status messages go through the module logger; enable them with e.g.
+logging.basicConfig(level=logging.INFO, format="%(message)s").
 """
 
+import logging
 import os
+import warnings
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from pathlib import Path
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+try:
+    import polars as pl  # Optional dependency: multithreaded CSV reader/writer
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_CSV_WRITE_BUFFER = 1 << 20  # bytes
+
+# pd.read_csv's default NA tokens; Polars on its own only treats "" as null
+_PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+]
 
 
 # ---------------------------------------------------------------------
@@ -17,36 +41,143 @@ import seaborn as sns
 # ---------------------------------------------------------------------
 def ensure_directory(path: str) -> None:
     """Ensure a directory exists; create it if missing."""
-    if not os.path.exists(path):
+    # exist_ok covers the "already there" case in the same call (no separate
+    # exists() check, no race). Not memoized: a cached "exists" would go stale
+    # if the folder is removed between runs in a long-lived process.
+    if path:  # "" is the current directory
         os.makedirs(path, exist_ok=True)
 
 
+def _write_csv(df: pd.DataFrame, path: str) -> None:
+    """Write with Polars' parallel writer when the output matches pandas, else pandas."""
+    frame = _polars_frame_like_pandas(df) if POLARS_AVAILABLE else None
+    if frame is not None:
+        frame.write_csv(path)
+        return
+    # pandas' writer has no pyarrow engine; a 1 MiB buffer instead of the
+    # default 8 KiB cuts the number of write syscalls
+    with open(path, "w", buffering=_CSV_WRITE_BUFFER, encoding="utf-8", newline="") as handle:
+        df.to_csv(handle, index=False)
+
+
+def _polars_frame_like_pandas(df: pd.DataFrame) -> "pl.DataFrame | None":
+    """
+    Polars copy of `df` whose write_csv output equals df.to_csv(index=False).
+
+    Booleans and naive datetimes are pre-formatted the way pandas writes
+    them, and empty strings are written unquoted. Returns None for columns Polars would format differently (floats
+    pandas writes in exponent form, tz-aware datetimes, timedeltas) and for
+    frames Polars cannot convert, so the caller uses pandas instead.
+    """
+    if df.shape[1] == 1 and df.iloc[:, 0].isna().any():
+        return None  # pandas quotes the empty rows of a single-column file
+    exprs = []
+    for name, col in df.items():
+        kind = col.dtype.kind
+        if kind == "f":
+            arr = col.to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(invalid="ignore"):
+                # repr() switches to 1e-05 style below 1e-4; Polars does not
+                if ((arr != 0) & (np.abs(arr) < 1e-4)).any():
+                    return None
+        elif kind == "b":
+            exprs.append(pl.col(name).replace_strict(
+                {True: "True", False: "False"}, return_dtype=pl.String))
+        elif kind == "M" and getattr(col.dtype, "tz", None) is None:
+            exprs.append(pl.col(name).dt.to_string(_pandas_datetime_format(col)))
+        elif kind in "Mm":
+            return None
+    try:
+        frame = pl.from_pandas(df)
+    except (TypeError, ValueError, pl.exceptions.PolarsError):
+        return None  # Mixed-type object columns: let pandas serialize them
+    # pandas writes empty strings unquoted, like missing values
+    frame = frame.with_columns(pl.col(pl.String).replace("", None))
+    return frame.with_columns(exprs) if exprs else frame
+
+
+def _pandas_datetime_format(col: pd.Series) -> str:
+    """strftime format pandas' CSV writer uses for a naive datetime column."""
+    ticks = col.dropna().to_numpy(dtype="datetime64[ns]").view(np.int64)
+    if (ticks % 86_400_000_000_000 == 0).all():
+        return "%Y-%m-%d"  # dates only
+    # One fraction width for the whole column, set by its finest value
+    sub_second = ticks % 1_000_000_000
+    if (sub_second % 1_000 != 0).any():
+        return "%Y-%m-%d %H:%M:%S%.9f"
+    if (sub_second % 1_000_000 != 0).any():
+        return "%Y-%m-%d %H:%M:%S%.6f"
+    if (sub_second != 0).any():
+        return "%Y-%m-%d %H:%M:%S%.3f"
+    return "%Y-%m-%d %H:%M:%S"
+
+
+def _read_csv(path: str) -> pd.DataFrame:
+    """Read with Polars' multithreaded parser when possible, else pandas."""
+    if POLARS_AVAILABLE:
+        try:
+            frame = pl.read_csv(path, infer_schema_length=10000,
+                                null_values=_PANDAS_NA_VALUES)
+        except pl.exceptions.NoDataError as err:
+            raise pd.errors.EmptyDataError(str(err)) from err
+        except pl.exceptions.ComputeError:
+            pass  # Type inference/parsing failed: pandas is more lenient
+        else:
+            frame = _match_pandas_inference(frame)
+            if frame is not None:
+                return frame.to_pandas()
+    return pd.read_csv(path)
+
+
+def _match_pandas_inference(frame: "pl.DataFrame") -> "pl.DataFrame | None":
+    """
+    Align Polars' column types with what pd.read_csv would infer.
+
+    Empty columns become float64 NaN, as in pandas. Returns None when a text
+    column holds only numbers (e.g. empty beyond the inference window), so
+    the caller can let pandas parse the file instead.
+    """
+    empty = []
+    for name, dtype in frame.schema.items():
+        if dtype not in (pl.String, pl.Null):
+            continue
+        col = frame[name]
+        nulls = col.null_count()
+        if nulls == frame.height:
+            empty.append(name)
+        elif col.cast(pl.Float64, strict=False).null_count() == nulls:
+            return None
+    if empty:
+        frame = frame.with_columns(pl.col(name).cast(pl.Float64) for name in empty)
+    return frame
+
+
 def save_csv_safely(df: pd.DataFrame, path: str) -> None:
     """Save DataFrame to CSV safely, ensuring directory exists."""
-    directory = os.path.dirname(path)
-    ensure_directory(directory)
+    # One exist-or-create call; also handles bare filenames (parent ".")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        df.to_csv(path, index=False)
-        print(f"✅ Saved file: {path}")
+        _write_csv(df, path)
+        logger.info("✅ Saved file: %s", path)
     except (OSError, ValueError) as err:
-        print(f"⚠️ Failed to save CSV: {err}")
+        logger.warning("⚠️ Failed to save CSV: %s", err)
 
 
 def load_csv_safely(path: str) -> pd.DataFrame:
     """Load a CSV safely, returning an empty DataFrame on failure."""
     try:
-        df = pd.read_csv(path)
-        print(f"✅ Loaded file: {path}")
+        df = _read_csv(path)
+        logger.info("✅ Loaded file: %s", path)
         return df
     except FileNotFoundError:
-        print(f"⚠️ File not found: {path}")
+        logger.warning("⚠️ File not found: %s", path)
         return pd.DataFrame()
     except pd.errors.EmptyDataError:
-        print(f"⚠️ File is empty: {path}")
+        logger.warning("⚠️ File is empty: %s", path)
         return pd.DataFrame()
     except pd.errors.ParserError as err:
-        print(f"⚠️ Parsing error while reading {path}: {err}")
+        logger.warning("⚠️ Parsing error while reading %s: %s", path, err)
         return pd.DataFrame()
 
 
@@ -77,21 +208,21 @@ def check_required_columns(df: pd.DataFrame, required_cols: list[str]) -> bool:
     """Check if all required columns exist in DataFrame."""
     missing = [col for col in required_cols if col not in df.columns]
     if missing:
-        print(f"⚠️ Missing columns: {missing}")
+        logger.warning("⚠️ Missing columns: %s", missing)
         return False
-    print("✅ All required columns found.")
+    logger.info("✅ All required columns found.")
     return True
 
 
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """Remove duplicate rows, logging how many were removed."""
-    initial = len(df)
-    df = df.drop_duplicates()
-    removed = initial - len(df)
+    keep_mask = ~df.duplicated(keep="first")
+    removed = len(keep_mask) - keep_mask.sum()
+    df = df.loc[keep_mask]
     if removed > 0:
-        print(f"✅ Removed {removed} duplicate rows.")
+        logger.info("✅ Removed %d duplicate rows.", removed)
     else:
-        print("No duplicate rows found.")
+        logger.info("No duplicate rows found.")
     return df
 
 
@@ -100,6 +231,10 @@ def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
 # ---------------------------------------------------------------------
 def set_plot_style() -> None:
     """Set a consistent Seaborn and Matplotlib plot style."""
+    # Plotting libraries load on first use, not when utils is imported
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     sns.set_theme(style="whitegrid")
     plt.rcParams.update({
         "figure.figsize": (8, 5),
@@ -114,23 +249,153 @@ def set_plot_style() -> None:
 
 def save_plot(filename: str, folder: str = "plots") -> None:
     """Save current Matplotlib plot to a folder."""
+    import matplotlib.pyplot as plt
+
     ensure_directory(folder)
     path = os.path.join(folder, filename)
     try:
         plt.savefig(path, dpi=300, bbox_inches="tight")
-        print(f"📊 Plot saved to: {path}")
+        logger.info("📊 Plot saved to: %s", path)
     except (OSError, ValueError) as err:
-        print(f"⚠️ Could not save plot: {err}")
+        logger.warning("⚠️ Could not save plot: %s", err)
+
+
+def show_and_close(figures: list) -> None:
+    """Display the given figures, then close them so pyplot drops its references."""
+    import matplotlib.pyplot as plt
+
+    figures = [fig for fig in figures if fig is not None]
+    if not figures:
+        return
+    plt.show()  # inline backends render every open figure; Agg is a no-op
+    for fig in figures:
+        plt.close(fig)
 
 
 # ---------------------------------------------------------------------
 # 5️⃣ Utility for consistent naming
 # ---------------------------------------------------------------------
+_CLEAN_DATA_DIR = Path("data")
+
+
+@lru_cache(maxsize=None)
 def generate_clean_filename(prefix: str, country: str) -> str:
-    if prefix:
-        return f"data/{prefix}_{country}_clean.csv"
-    else:
-        return f"data/{country}_clean.csv"
+    """Return the output path for a cleaned dataset, e.g. data/benin_clean.csv."""
+    name = f"{prefix}_{country}_clean.csv" if prefix else f"{country}_clean.csv"
+    return str(_CLEAN_DATA_DIR / name)
+
+
+# ---------------------------------------------------------------------
+# 6️⃣ Caching Utilities
+# ---------------------------------------------------------------------
+def frame_fingerprint(df: pd.DataFrame) -> tuple:
+    """Content-based key for a DataFrame: shape, columns, dtypes and a row-hash sum."""
+    row_hash = int(pd.util.hash_pandas_object(df, index=False).sum())
+    return (df.shape, tuple(df.columns), tuple(map(str, df.dtypes)), row_hash)
+
+
+def cache_by_frame(maxsize: int = 8):
+    """
+    Memoize a function whose first argument is a DataFrame.
+
+    Entries are keyed by frame_fingerprint() plus the remaining arguments and
+    evicted least-recently-used. Cached results are shared between calls,
+    so treat them as read-only.
+    """
+    def decorator(func):
+        cache: OrderedDict = OrderedDict()
+
+        @wraps(func)
+        def wrapper(df: pd.DataFrame, *args, **kwargs):
+            key = (frame_fingerprint(df), args, tuple(sorted(kwargs.items())))
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            result = func(df, *args, **kwargs)
+            cache[key] = result
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------
+# 7️⃣ Numeric Helpers
+# ---------------------------------------------------------------------
+@cache_by_frame()
+def describe_and_missing(df: pd.DataFrame, include: str | None = None) -> tuple[pd.DataFrame, pd.Series]:
+    """Return (df.describe(include=...), per-column missing counts), cached per dataset."""
+    return df.describe(include=include), df.isna().sum()
+
+
+def numeric_block(df: pd.DataFrame, cols: list[str]) -> np.ndarray:
+    """
+    Return df[cols] as one writable, column-major float64 array.
+
+    Object columns are coerced with pd.to_numeric (unparsable values become
+    NaN); numeric columns are used as they are, so the block costs a single
+    copy and can be modified in place without touching `df`.
+    """
+    sub = df[cols]
+    coerce = [col for col in cols if not pd.api.types.is_numeric_dtype(sub[col])]
+    if coerce:
+        sub = sub.assign(**{col: pd.to_numeric(sub[col], errors="coerce") for col in coerce})
+    # Column-major, so every column is contiguous for per-column kernels
+    return np.asfortranarray(sub.to_numpy(dtype=np.float64, copy=True))
+
+
+def block_nan_mean_std(arr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Column mean and sample std (ddof=1) of a 2-D block, skipping NaN.
+
+    Sum and sum of squares come from one read of the shifted, zero-filled
+    block (sum + einsum) instead of the separate passes of nanmean and
+    nanstd. Shifting by each column's first valid value avoids cancellation
+    and keeps constant columns at exactly zero std.
+    """
+    if arr.shape[0] == 0:
+        empty = np.full(arr.shape[1], np.nan)  # no rows: no statistics, as in pandas
+        return empty, empty.copy()
+    valid = ~np.isnan(arr)
+    count = valid.sum(axis=0)
+    shift = np.nan_to_num(arr[valid.argmax(axis=0), np.arange(arr.shape[1])])
+    shifted = np.where(valid, arr - shift, 0.0)
+    total = shifted.sum(axis=0)
+    sq_total = np.einsum("ij,ij->j", shifted, shifted)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_shifted = total / count
+        var = np.maximum(sq_total - total * mean_shifted, 0.0) / (count - 1)
+    mean = mean_shifted + shift
+    mean[count == 0] = np.nan
+    var[count < 2] = np.nan
+    return mean, np.sqrt(var)
+
+
+def correlation_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pearson correlation of the numeric columns.
+
+    All-NaN and constant columns (e.g. the empty Comments column of the
+    country files) carry no correlation and are dropped first. Complete data
+    goes through a single np.corrcoef call; with gaps, DataFrame.corr keeps
+    pairwise-complete observations for each pair, as the notebooks expect.
+    """
+    numeric = df.select_dtypes(include=np.number)
+    arr = numeric.to_numpy(dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        keep = np.nanmax(arr, axis=0, initial=-np.inf) > np.nanmin(arr, axis=0, initial=np.inf)
+    numeric = numeric.loc[:, keep]
+    arr = arr[:, keep]
+    if np.isnan(arr).any():
+        return numeric.corr()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.atleast_2d(np.corrcoef(arr, rowvar=False))
+    return pd.DataFrame(corr, index=numeric.columns, columns=numeric.columns)
 
 
 # ---------------------------------------------------------------------
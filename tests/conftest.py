@@ -0,0 +1,49 @@
+"""
+conftest.py — Shared pytest fixtures for the test suite.
+
+Sample frames are built once per test session. Tests must not modify them;
+tests that need a frame of their own build it with the sample_frames helpers.
+"""
+
+import os
+
+import matplotlib
+import pandas as pd  # also warms the module cache before test collection
+import pytest
+from sample_frames import make_cleaning_df
+
+# Headless plotting: select Agg before anything imports pyplot, and pass it
+# on to worker processes (xdist, joblib) through the environment
+os.environ.setdefault("MPLBACKEND", "Agg")
+matplotlib.use("Agg", force=True)
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture(scope="session")
+def sample_cleaning_df() -> pd.DataFrame:
+    """
+    Provide a sample DataFrame with missing values and outliers
+    for testing cleaning functions.
+    """
+    return make_cleaning_df(copy=False)
+
+
+@pytest.fixture(scope="session")
+def dummy_csv_path(tmp_path_factory):
+    """Write the dummy country CSV once per session; treat the file as read-only."""
+    sample_data = pd.DataFrame({
+        "Country": ["Benin", "Togo"],
+        "Value": [100, 200]
+    })
+    csv_path = tmp_path_factory.mktemp("data") / "benin.csv"
+    sample_data.to_csv(csv_path, index=False)
+    return csv_path
+
+
+@pytest.fixture(scope="session")
+def plot_style():
+    """Apply set_plot_style() once for every test that needs the shared style."""
+    from src.utils import set_plot_style  # plotting stack loads only when requested
+
+    set_plot_style()
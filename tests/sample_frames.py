@@ -0,0 +1,28 @@
+"""
+sample_frames.py — Sample data shared by conftest.py and the test modules.
+
+Columns are ready float64 arrays, so building a frame needs no per-element
+None -> NaN inference.
+"""
+
+import numpy as np
+import pandas as pd
+
+CLEANING_GHI = np.array([1, np.nan, 3, 1000], dtype=np.float64)  # 1000 is an outlier
+CLEANING_DNI = np.array([np.nan, 5, 6, 7], dtype=np.float64)
+OUTLIER_GHI = np.array([1, 2, 3, 1000], dtype=np.float64)  # 1000 is clearly an outlier
+OUTLIER_DNI = np.array([4, 5, 6, 7], dtype=np.float64)
+
+
+def make_cleaning_df(copy: bool = True) -> pd.DataFrame:
+    """
+    DataFrame with missing values and an outlier.
+
+    copy=False shares the module arrays; only use it for read-only frames.
+    """
+    return pd.DataFrame({"ghi": CLEANING_GHI, "dni": CLEANING_DNI}, copy=copy)
+
+
+def make_outlier_df() -> pd.DataFrame:
+    """Fresh DataFrame with an obvious outlier and no NaN values."""
+    return pd.DataFrame({"ghi": OUTLIER_GHI, "dni": OUTLIER_DNI}, copy=True)
@@ -2,64 +2,104 @@
 test_cleaning.py — Unit tests for src/cleaning.py module.
 
 Tests:
+- handle_missing
 - fill_missing_values
-- remove_outliers_iqr
+- remove_outliers (row filter) and remove_outliers_iqr
+- clean_numeric_columns
+- clip_outliers_mad
+- clean_country_file / clean_countries
+- remove_outliers_zscore, preprocess_dataset engines, preprocess_all (src/preprocess.py)
 """
 
+import numpy as np
 import pandas as pd
 import pytest
-from src.cleaning import fill_missing_values, remove_outliers_iqr
+from sample_frames import CLEANING_GHI, OUTLIER_GHI, make_cleaning_df, make_outlier_df
+from src.cleaning import (
+    fill_missing_values, remove_outliers, remove_outliers_iqr, clean_numeric_columns,
+    clip_outliers_mad, clean_country_file, clean_countries, handle_missing,
+)
+from src import data_loader, kernels, preprocess
+from src.kernels import NUMBA_AVAILABLE
+from src.preprocess import preprocess_all, preprocess_dataset, remove_outliers_zscore
 
 # pylint: disable=redefined-outer-name
 
+# The numba variants only run where the compiled kernels exist
+_needs_numba = pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba not installed")
+ENGINES = ["pandas", pytest.param("numba", marks=_needs_numba)]
 
-@pytest.fixture
-def sample_cleaning_df() -> pd.DataFrame:  # pylint: disable=redefined-outer-name
-    """
-    Provide a sample DataFrame with missing values and outliers
-    for testing cleaning functions.
-    """
-    return pd.DataFrame({
-        "ghi": [1, None, 3, 1000],  # 1000 is an outlier
-        "dni": [None, 5, 6, 7]
-    })
 
+def test_handle_missing_arrow_strings():
+    """Arrow-backed text columns (as preprocess_dataset makes them) take the mode."""
+    df = make_cleaning_df().assign(
+        site=pd.array(["north", None, "north", "south"], dtype="string[pyarrow]"))
+
+    filled = handle_missing(df)
+
+    assert filled["site"].tolist() == ["north", "north", "north", "south"]
+    assert filled["ghi"].to_numpy()[1] == 3.0  # median of [1, 3, 1000]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("cols, expected", [
+    (["ghi"], {"ghi": 3.0}),                     # median of [1, 3, 1000]
+    (["ghi", "dni"], {"ghi": 3.0, "dni": 6.0}),  # dni: median of [5, 6, 7]
+])
+def test_fill_missing_values(cols, expected, engine):
+    """Missing values in the listed columns are filled with the column median."""
+    df = make_cleaning_df()
+    df_filled = fill_missing_values(df, cols, engine=engine)
+    for col, median in expected.items():
+        was_missing = np.isnan(df[col].to_numpy())
+        arr = df_filled[col].to_numpy()
+        assert np.isnan(arr).sum() == 0
+        assert (arr[was_missing] == median).all()
 
-@pytest.fixture
-def simple_outlier_df() -> pd.DataFrame:
-    """Simple DataFrame with obvious outlier, no NaN values."""
-    return pd.DataFrame({
-        "ghi": [1, 2, 3, 1000],  # 1000 is clearly an outlier
-        "dni": [4, 5, 6, 7]
-    })
 
+def test_fill_missing_values_skips_clean_columns(monkeypatch):
+    """Only columns with gaps pay for a median."""
+    calls = []
+    nanmedian = np.nanmedian
 
-def test_fill_missing_values_numeric(sample_cleaning_df):
-    """Test filling missing numeric values."""
-    # Test with single column
-    df_filled = fill_missing_values(sample_cleaning_df.copy(), ["ghi"])
-    assert df_filled["ghi"].isna().sum() == 0
-    # Should be filled with median (3.0) of [1, 3, 1000]
-    assert df_filled.loc[1, "ghi"] == 3.0
+    def counting_nanmedian(arr, *args, **kwargs):
+        calls.append(arr.shape)
+        return nanmedian(arr, *args, **kwargs)
+
+    monkeypatch.setattr(np, "nanmedian", counting_nanmedian)
+    df = make_outlier_df().assign(gap=CLEANING_GHI)  # ghi and dni have no NaN
+
+    df_filled = fill_missing_values(df, ["ghi", "dni", "gap"], engine="pandas")
+
+    assert len(calls) == 1
+    assert df_filled["gap"].to_numpy()[1] == 3.0  # median of [1, 3, 1000]
+    assert df_filled["ghi"].to_numpy().tolist() == OUTLIER_GHI.tolist()
+
+
+def test_remove_outliers_bounds_from_unfiltered_data():
+    """Every column's IQR bounds come from the full data; NaN rows are dropped."""
+    df = pd.DataFrame({
+        "a": [1.0, 2, 3, 4, 5, 6, 7, 100, 100, np.nan],
+        "b": [10.0, 10, 10, 10, 10, 18, 40, 40, 40, 10],
+    })
 
+    kept = remove_outliers(df, ["a", "b"])
 
-def test_fill_missing_values_multiple_columns(sample_cleaning_df):
-    """Test filling missing values in multiple columns."""
-    df_filled = fill_missing_values(sample_cleaning_df.copy(), ["ghi", "dni"])
-    assert df_filled["ghi"].isna().sum() == 0
-    assert df_filled["dni"].isna().sum() == 0
-    assert df_filled.loc[1, "ghi"] == 3.0  # median of [1, 3, 1000]
-    assert df_filled.loc[0, "dni"] == 6.0  # median of [5, 6, 7]
+    # a: [-3, 13] drops rows 7, 8 (and the NaN in row 9). b: [-26.75, 71.25]
+    # on the full column keeps row 6; bounds taken after filtering on a
+    # ([4, 20]) would have dropped it.
+    assert kept.index.tolist() == [0, 1, 2, 3, 4, 5, 6]
 
 
-def test_remove_outliers_iqr_debug(simple_outlier_df):
+def test_remove_outliers_iqr_debug():
     """Test removing outliers with IQR method."""
+    simple_outlier_df = make_outlier_df()
     print("=== DEBUGGING remove_outliers_iqr ===")
     print("Original DataFrame:")
     print(simple_outlier_df)
     print("GHI values:", simple_outlier_df["ghi"].values)
 
-    df_clean = remove_outliers_iqr(simple_outlier_df.copy(), ["ghi"])
+    df_clean = remove_outliers_iqr(simple_outlier_df, ["ghi"])
 
     print("After remove_outliers_iqr:")
     print(df_clean)
@@ -69,16 +109,162 @@ def test_remove_outliers_iqr_debug(simple_outlier_df):
     assert len(df_clean) == len(simple_outlier_df)
 
     # The outlier value 1000 should be REPLACED with the median (2.0)
-    assert 1000 not in df_clean["ghi"].values
-    assert df_clean.loc[3, "ghi"] == 2.5  # median of [1, 2, 3]
+    arr = df_clean["ghi"].to_numpy()
+    assert not (arr == 1000).any()
+    assert arr[3] == 2.5  # median of [1, 2, 3]
 
 
-def test_remove_outliers_iqr_original(sample_cleaning_df):
-    """Test removing outliers with original data (with NaN values)."""
-    df_clean = remove_outliers_iqr(sample_cleaning_df.copy(), ["ghi"])
+def test_remove_outliers_iqr_original():
+    """With NaN and only three values, 1000 lies inside the IQR bounds and is kept."""
+    df = make_cleaning_df()
+    df_clean = remove_outliers_iqr(df, ["ghi"])
 
     # The function REPLACES outliers with median, doesn't remove rows
-    assert len(df_clean) == len(sample_cleaning_df)
+    assert len(df_clean) == len(df)
+
+    # [1, 3, 1000]: Q1 = 2, Q3 = 501.5, so Q3 + 1.5 * IQR = 1250.75 > 1000
+    arr = df_clean["ghi"].to_numpy()
+    assert arr[3] == 1000
+    assert np.isnan(arr[1])  # NaN is not an outlier
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_remove_outliers_zscore(engine):
+    """|Z| > 3 values take the column median; NaN and inliers are kept."""
+    ghi = np.append(np.arange(1.0, 21.0), [np.nan, 1000.0])  # |Z| of 1000 is ~4.4
+    dni = np.arange(1.0, 23.0)  # no outlier
+    df = pd.DataFrame({"ghi": ghi, "dni": dni})
+
+    df_clean = remove_outliers_zscore(df, ["ghi", "dni"], engine=engine)
+
+    arr = df_clean["ghi"].to_numpy()
+    assert arr[21] == 11.0  # median of 1..20 and 1000
+    assert np.isnan(arr[20])
+    assert (arr[:20] == ghi[:20]).all()
+    assert (df_clean["dni"].to_numpy() == dni).all()
+    assert df.loc[21, "ghi"] == 1000  # input not modified
+
+    # Zero rows: the empty frame comes back unchanged on every engine
+    empty = remove_outliers_zscore(df.iloc[:0], ["ghi", "dni"], engine=engine)
+    pd.testing.assert_frame_equal(empty, df.iloc[:0])
+
+
+@_needs_numba
+def test_remove_outliers_zscore_engines_agree():
+    """The compiled kernel and the NumPy path replace the same values."""
+    df = pd.DataFrame({"ghi": np.append(np.arange(1.0, 21.0), [np.nan, 1000.0])})
+    by_numba = remove_outliers_zscore(df, ["ghi"], engine="numba")
+    by_pandas = remove_outliers_zscore(df, ["ghi"], engine="pandas")
+
+    pd.testing.assert_frame_equal(by_numba, by_pandas)
+    assert by_pandas["ghi"].to_numpy()[21] == 11.0  # median of 1..20 and 1000
+
+
+@pytest.mark.parametrize("func", [fill_missing_values, remove_outliers_zscore])
+def test_engine_is_validated(monkeypatch, func):
+    """Unknown engines are rejected; "numba" without Numba is an ImportError."""
+    df = make_cleaning_df()
+    with pytest.raises(ValueError, match="engine"):
+        func(df, ["ghi"], engine="numpy")
+
+    monkeypatch.setattr(kernels, "NUMBA_AVAILABLE", False)
+    with pytest.raises(ImportError, match="numba"):
+        func(df, ["ghi"], engine="numba")
+
+
+def test_clean_numeric_columns_fills_and_replaces():
+    """NaN and |Z| > 3 values are both replaced by the original column median."""
+    values = [float(v) for v in range(1, 21)] + [None, 1000.0]
+    df = pd.DataFrame({"ghi": values, "label": ["x"] * len(values)})
+    expected_median = np.nanmedian(np.array(values, dtype=np.float64))
+
+    df_clean = clean_numeric_columns(df, ["ghi", "missing_col"])
+
+    arr = df_clean["ghi"].to_numpy()
+    assert np.isnan(arr).sum() == 0
+    assert arr[20] == expected_median  # NaN filled
+    assert arr[21] == expected_median  # outlier replaced
+    assert arr[0] == 1.0  # inliers untouched
+    assert np.isnan(df["ghi"].to_numpy()).sum() == 1  # input not modified
+
+
+def test_clip_outliers_mad(sample_cleaning_df):
+    """MAD flags the 1000 that inflates the std; NaN and inliers are kept."""
+    df_clean = clip_outliers_mad(sample_cleaning_df.copy(deep=False), ["ghi", "dni"])
+
+    ghi = df_clean["ghi"].to_numpy()
+    assert ghi[3] == 3.0  # median of [1, 3, 1000]
+    assert ghi[0] == 1.0
+    assert np.isnan(ghi[1])
+    assert df_clean["dni"].to_numpy()[1:].tolist() == [5.0, 6.0, 7.0]
+    assert sample_cleaning_df.loc[3, "ghi"] == 1000  # input not modified
+
+
+def test_fill_missing_values_polars(sample_cleaning_df):
+    """Polars input is filled through Narwhals and stays a Polars frame."""
+    pl = pytest.importorskip("polars")
+    pytest.importorskip("narwhals")
+    df_filled = fill_missing_values(pl.from_pandas(sample_cleaning_df), ["ghi", "dni"])
+
+    assert isinstance(df_filled, pl.DataFrame)
+    assert df_filled.null_count().sum_horizontal().item() == 0
+    assert df_filled["ghi"][1] == 3.0  # median of [1, 3, 1000]
+    assert df_filled["dni"][0] == 6.0  # median of [5, 6, 7]
+
+
+def test_preprocess_dataset_rejects_unknown_engine(sample_cleaning_df):
+    """A misspelled engine is an error, not a silent pandas run."""
+    with pytest.raises(ValueError, match="engine"):
+        preprocess_dataset(sample_cleaning_df, "benin", engine="polar")
+
+
+def test_preprocess_dataset_polars_engine_needs_polars(monkeypatch, sample_cleaning_df):
+    """Asking for Polars without it installed raises ImportError."""
+    monkeypatch.setattr(preprocess, "POLARS_AVAILABLE", False)
+    with pytest.raises(ImportError, match="polars"):
+        preprocess_dataset(sample_cleaning_df, "benin", engine="polars")
+
+
+def _write_country_csvs(directory) -> dict[str, str]:
+    """Two small raw country files with gaps and an outlier; returns country -> filename."""
+    files = {}
+    for country, offset in [("benin", 0.0), ("togo", 5.0)]:
+        ghi = np.append(np.arange(1.0, 21.0) + offset, [np.nan, 1000.0])
+        pd.DataFrame({
+            "GHI": ghi,
+            "Tamb": np.linspace(20.0, 30.0, len(ghi)),
+            "Site Name": [country] * len(ghi),
+        }).to_csv(directory / f"{country}.csv", index=False)
+        files[country] = f"{country}.csv"
+    return files
+
+
+def test_clean_countries_matches_sequential(monkeypatch, tmp_path):
+    """Worker processes give the same frames as cleaning each file in turn."""
+    files = _write_country_csvs(tmp_path)
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
+
+    cleaned = clean_countries(files, n_jobs=2)
+
+    assert list(cleaned) == ["benin", "togo"]
+    for country, filename in files.items():
+        pd.testing.assert_frame_equal(cleaned[country], clean_country_file(filename))
+    assert not cleaned["benin"]["ghi"].isna().any()
+    assert cleaned["benin"]["ghi"].iloc[-1] != 1000.0  # outlier replaced
+
+
+def test_preprocess_all_maps_countries(monkeypatch, tmp_path):
+    """Every country file is preprocessed, keyed by country and exported."""
+    files = _write_country_csvs(tmp_path)
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
+    monkeypatch.chdir(tmp_path)  # cleaned files go to ./data
+
+    # One job runs in this process, so the chdir above applies to the export
+    results = preprocess_all(files, n_jobs=1, engine="pandas")
 
-    # The outlier value 1000 should be REPLACED with the median
-    assert 1000 not in df_clean["ghi"].values
+    assert list(results) == ["benin", "togo"]
+    for country, df in results.items():
+        assert list(df.columns) == ["ghi", "tamb", "site_name"]
+        assert not df["ghi"].isna().any()
+        assert df["ghi"].iloc[-1] != 1000.0  # outlier replaced
+        assert (tmp_path / "data" / f"{country}_clean.csv").exists()
@@ -5,38 +5,41 @@ Covers:
 - Successful loading of existing data
 - Handling of missing or invalid files
 - Behavior with empty files
+- Parquet sibling written by convert_to_parquet
+- Worker count and thread budget of map_country_files
 """
 
+import os
+
 import pandas as pd
 import pytest
+from joblib import cpu_count
 from src import data_loader
-from src.data_loader import load_country_data
+from src.data_loader import convert_to_parquet, load_country_data, map_country_files
+
 
+# pylint: disable=redefined-outer-name
 
-def test_load_country_data_valid(monkeypatch, tmp_path):
+
+def test_load_country_data_valid(monkeypatch, dummy_csv_path):
     """Test loading a valid CSV file returns a non-empty DataFrame."""
-    # Create a dummy CSV file
-    sample_data = pd.DataFrame({
-        "Country": ["Benin", "Togo"],
-        "Value": [100, 200]
-    })
-    csv_path = tmp_path / "benin.csv"
-    sample_data.to_csv(csv_path, index=False)
-
-    # Monkeypatch the loader to use this file
-    monkeypatch.setattr(data_loader, "DATA_PATH", tmp_path)
-
-    df = load_country_data("benin")
+    # Point the loader's data directory at the shared dummy file
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", dummy_csv_path.parent)
+
+    # Explicit types: the parser skips inference on the tiny file
+    df = load_country_data(dummy_csv_path.name,
+                           dtype={"Country": "object", "Value": "int64"})
     assert isinstance(df, pd.DataFrame)
     assert not df.empty
     assert "Country" in df.columns
+    assert df["Value"].dtype == "int64"
 
 
 def test_load_country_data_missing_file(monkeypatch, tmp_path):
     """Test loading a non-existent country raises FileNotFoundError."""
-    monkeypatch.setattr(data_loader, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
     with pytest.raises(FileNotFoundError):
-        load_country_data("missing_country")
+        load_country_data("missing_country.csv")
 
 
 def test_load_country_data_empty_file(monkeypatch, tmp_path):
@@ -45,7 +48,40 @@ def test_load_country_data_empty_file(monkeypatch, tmp_path):
     empty_csv.write_text("")  # create an empty file
 
     # Patch so it looks for this file
-    monkeypatch.setattr(data_loader, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
 
     with pytest.raises(pd.errors.EmptyDataError):
-        load_country_data("empty")
+        load_country_data(empty_csv.name)
+
+
+def test_convert_to_parquet_roundtrip(monkeypatch, tmp_path, dummy_csv_path):
+    """The Parquet sibling is written next to the CSV and loads the same data."""
+    csv_path = tmp_path / dummy_csv_path.name
+    csv_path.write_bytes(dummy_csv_path.read_bytes())
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
+    from_csv = load_country_data(csv_path.name)  # no sibling yet: parsed from the CSV
+
+    parquet_path = convert_to_parquet(csv_path.name)
+
+    assert parquet_path == csv_path.with_suffix(".parquet")
+    assert parquet_path.exists()
+    pd.testing.assert_frame_equal(load_country_data(csv_path.name), from_csv)
+
+
+def _worker_threads(path, country):
+    """Report the Polars thread budget seen by the worker process."""
+    return os.path.basename(path), country, os.environ.get("POLARS_MAX_THREADS")
+
+
+def test_map_country_files_thread_budget(monkeypatch, tmp_path):
+    """Workers get an even share of the cores; this process's env is untouched."""
+    monkeypatch.delenv("POLARS_MAX_THREADS", raising=False)
+    monkeypatch.setattr(data_loader, "BASE_DATA_DIR", tmp_path)
+
+    files = {"benin": "b.csv", "togo": "t.csv"}
+    results = map_country_files(_worker_threads, files, 8)  # capped at two workers
+
+    threads = str(max(1, cpu_count() // 2))
+    assert results == {"benin": ("b.csv", "benin", threads),
+                       "togo": ("t.csv", "togo", threads)}
+    assert "POLARS_MAX_THREADS" not in os.environ
@@ -2,31 +2,130 @@
 test_utils.py — Unit tests for utility functions.
 """
 
+import numpy as np
 import pandas as pd
 import pytest
-from src.cleaning import fill_missing_values, remove_outliers_iqr
+from src.utils import (
+    block_nan_mean_std, correlation_matrix, describe_and_missing, load_csv_safely,
+    save_csv_safely, show_and_close,
+)
 
 # pylint: disable=redefined-outer-name
 
 
-@pytest.fixture
-def sample_df() -> pd.DataFrame:
-    """Provide a sample DataFrame for testing."""
-    return pd.DataFrame({
-        "column1": [1, None, 3, 1000],
-        "column2": [None, 5, 6, 7]
+def test_correlation_matrix_matches_pandas():
+    """np.corrcoef-based matrix should agree with DataFrame.corr on complete data."""
+    df = pd.DataFrame({
+        "ghi": [1.0, 2.0, 3.0, 4.0],
+        "dni": [2.0, 4.1, 5.9, 8.2],
+        "label": ["a", "b", "c", "d"]
     })
+    corr = correlation_matrix(df)
+    expected = df.corr(numeric_only=True)
+    assert list(corr.columns) == ["ghi", "dni"]
+    pd.testing.assert_frame_equal(corr, expected)
 
 
-def test_fill_missing_values_basic(sample_df):
-    """Test basic missing value filling."""
-    df_filled = fill_missing_values(sample_df.copy(), ["column1"])
-    assert df_filled["column1"].isna().sum() == 0
+def test_correlation_matrix_pairwise_with_gaps():
+    """An empty column is dropped and sparse columns keep pairwise observations."""
+    df = pd.DataFrame({
+        "ghi": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        "dni": [2.0, None, 5.9, 8.2, 9.5, None],
+        "tamb": [25.1, 24.0, None, 27.3, 26.0, 28.4],
+        "comments": [None] * 6,
+    }).astype({"comments": float})
+    corr = correlation_matrix(df)
+    expected = df[["ghi", "dni", "tamb"]].corr()
+    assert list(corr.columns) == ["ghi", "dni", "tamb"]
+    assert not corr.isna().any().any()
+    pd.testing.assert_frame_equal(corr, expected)
 
 
-def test_remove_outliers_iqr_basic(sample_df):
-    """Test basic outlier removal with IQR method."""
-    df_clean = remove_outliers_iqr(sample_df.copy(), ["column1"])
-    assert len(df_clean) == len(sample_df)
-    # Outlier should be replaced
-    assert 1000 not in df_clean["column1"].values
+def test_block_nan_mean_std_matches_pandas():
+    """Fused moments agree with DataFrame.mean/std; constant columns get std 0."""
+    df = pd.DataFrame({
+        "ghi": [None, 610.5, 598.0, 640.25, None, 605.0],
+        "tamb": [25.1] * 6,
+        "rh": [None] * 5 + [80.0],
+    })
+    mean, std = block_nan_mean_std(df.to_numpy(dtype=float))
+    pd.testing.assert_series_equal(pd.Series(mean, index=df.columns), df.mean())
+    pd.testing.assert_series_equal(pd.Series(std, index=df.columns), df.std())
+    assert std[1] == 0.0
+
+    # Zero rows: NaN statistics instead of an argmax error
+    mean, std = block_nan_mean_std(df.iloc[:0].to_numpy(dtype=float))
+    assert np.isnan(mean).all() and np.isnan(std).all()
+    assert mean.shape == std.shape == (3,)
+
+
+def test_describe_and_missing_cached_by_content():
+    """Equal frames hit the cache; a modified frame is recomputed."""
+    df = pd.DataFrame({"ghi": [1.0, None, 3.0]})
+    first = describe_and_missing(df)
+    assert describe_and_missing(df.copy()) is first
+    assert first[1]["ghi"] == 1
+
+    changed = df.fillna(2.0)
+    assert describe_and_missing(changed) is not first
+    assert describe_and_missing(changed)[1]["ghi"] == 0
+
+
+def test_save_csv_safely(tmp_path):
+    """The file and its missing parent folder are created with one line per row."""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    filepath = tmp_path / "nested" / "test.csv"
+    save_csv_safely(df, str(filepath))
+
+    # Stat and line count only: no CSV parsing needed to verify the write
+    assert filepath.stat().st_size > 0
+    with open(filepath, encoding="utf-8") as handle:
+        assert sum(1 for _ in handle) == len(df) + 1  # header + rows
+
+
+@pytest.mark.parametrize("tiny", [0.5, 1e-7])  # 1e-7 is written as 1e-07 by pandas
+def test_save_csv_safely_matches_pandas_output(tmp_path, tiny):
+    """The written text equals df.to_csv(index=False), whichever writer runs."""
+    df = pd.DataFrame({
+        "flag": [True, False, True],
+        "ghi": [1.5, None, tiny],
+        "timestamp": pd.to_datetime(["2024-01-01 00:00:00", "2024-01-01 00:00:00.5",
+                                     "2024-01-01 00:01:00"], format="ISO8601"),
+        "day": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+        "comments": ["", "a,b", None],
+    })
+    filepath = tmp_path / "written.csv"
+    save_csv_safely(df, str(filepath))
+
+    assert filepath.read_text(encoding="utf-8") == df.to_csv(index=False)
+
+
+def test_load_csv_safely_reads_na_tokens_as_nan(tmp_path):
+    """NA tokens and empty columns load as float64 NaN, as with pd.read_csv."""
+    filepath = tmp_path / "tokens.csv"
+    filepath.write_text("GHI,Comments,Site\n1,,a\nNA,,b\n3,,c\n", encoding="utf-8")
+
+    df = load_csv_safely(str(filepath))
+
+    assert df["GHI"].dtype == "float64"
+    assert df["Comments"].dtype == "float64"
+    assert df["GHI"].isna().tolist() == [False, True, False]
+    assert df["Comments"].isna().all()
+    assert df["Site"].tolist() == ["a", "b", "c"]
+
+
+def test_set_plot_style(plot_style):
+    """The session-wide style is applied to matplotlib's rcParams."""
+    import matplotlib as mpl
+
+    assert tuple(mpl.rcParams["figure.figsize"]) == (8.0, 5.0)
+    assert mpl.rcParams["axes.titlesize"] == 12
+
+
+def test_show_and_close_releases_figures():
+    """Figures handed to show_and_close are removed from pyplot's registry."""
+    import matplotlib.pyplot as plt
+
+    fig, _ = plt.subplots()
+    show_and_close([fig, None])
+    assert fig.number not in plt.get_fignums()